@@ -0,0 +1,232 @@
+"""Season archival of finished games and streaming results export.
+
+Finished games are moved out of the hot ``trivia.db`` into one JSONL file per
+season (one line per game) so list endpoints and the leaderboard join only see
+live data. Their questions and question statistics stay behind as the question
+bank, detached from the removed rounds. Run it between quiz nights with::
+
+    python -m backend.archive --season 2026-autumn
+"""
+
+import argparse
+import csv
+import io
+import json
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Dict, Iterator, List, Tuple
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import OperationalError
+from sqlmodel import Session, select
+
+from backend import crud
+from backend.database import engine, get_session
+from backend.models import AnswerSubmission, Game, GamePhase, Question, Round, Team, User
+
+ARCHIVE_DIR = os.environ.get("ARCHIVE_DIR", "archive")
+
+EXPORT_BATCH_SIZE = 500
+
+RESULT_COLUMNS = [
+    "game_id",
+    "round_number",
+    "question_order",
+    "question_id",
+    "question_text",
+    "answer",
+    "team_id",
+    "team_name",
+    "answer_text",
+    "is_correct",
+]
+
+_SEASON_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9_.-]*")
+
+logger = logging.getLogger(__name__)
+
+
+def season_path(season: str, archive_dir: str = ARCHIVE_DIR) -> str:
+    """Return the archive file for ``season``, rejecting unsafe names."""
+    if not _SEASON_RE.fullmatch(season):
+        raise ValueError("Season may only contain letters, digits, '.', '_' and '-'")
+    return os.path.join(archive_dir, f"{season}.jsonl")
+
+
+def _game_record(session: Session, game: Game) -> dict:
+    rounds = session.exec(select(Round).where(Round.game_id == game.id).order_by(Round.number)).all()
+    round_ids = [round_.id for round_ in rounds]
+    questions = session.exec(
+        select(Question).where(Question.round_id.in_(round_ids)).order_by(Question.round_id, Question.order)
+    ).all()
+    question_ids = [question.id for question in questions]
+    submissions = session.exec(
+        select(AnswerSubmission).where(AnswerSubmission.question_id.in_(question_ids)).order_by(AnswerSubmission.id)
+    ).all()
+    team_ids = sorted({submission.team_id for submission in submissions})
+    teams = session.exec(select(Team).where(Team.id.in_(team_ids))).all()
+    members = session.exec(select(User).where(User.team_id.in_(team_ids))).all()
+
+    questions_by_round: Dict[int, List[dict]] = {round_id: [] for round_id in round_ids}
+    for question in questions:
+        questions_by_round[question.round_id].append(
+            {
+                "id": question.id,
+                "order": question.order,
+                "text": question.text,
+                "answer": question.answer,
+                "media_url": question.media_url,
+            }
+        )
+    members_by_team: Dict[int, List[str]] = {team_id: [] for team_id in team_ids}
+    for member in members:
+        members_by_team[member.team_id].append(member.name)
+
+    return {
+        "game": {"id": game.id, "title": game.title, "phase": game.phase.value},
+        "rounds": [
+            {"number": round_.number, "questions": questions_by_round[round_.id]}
+            for round_ in rounds
+        ],
+        "teams": [
+            {"id": team.id, "name": team.name, "members": members_by_team[team.id]}
+            for team in teams
+        ],
+        "submissions": [
+            {
+                "question_id": submission.question_id,
+                "team_id": submission.team_id,
+                "answer_text": submission.answer_text,
+                "is_correct": submission.is_correct,
+            }
+            for submission in submissions
+        ],
+        "archived_at": datetime.utcnow().isoformat(),
+    }
+
+
+def _delete_game(session: Session, record: dict) -> None:
+    game_id = record["game"]["id"]
+    question_ids = [question["id"] for round_ in record["rounds"] for question in round_["questions"]]
+
+    session.execute(delete(AnswerSubmission).where(AnswerSubmission.question_id.in_(question_ids)))
+    game = session.get(Game, game_id)
+    game.current_question_id = None
+    session.add(game)
+    session.flush()
+    # Questions are the question bank: detach them and keep them with their statistics
+    session.execute(update(Question).where(Question.id.in_(question_ids)).values(round_id=None))
+    session.execute(delete(Round).where(Round.game_id == game_id))
+    session.delete(game)
+
+
+def vacuum() -> bool:
+    """Reclaim free pages in the hot database after rows were removed.
+
+    Returns False instead of raising when another connection holds the
+    database; the space is then reclaimed by a later run.
+    """
+    try:
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.exec_driver_sql("VACUUM")
+    except OperationalError as exc:
+        logger.warning("VACUUM skipped: %s", exc)
+        return False
+    return True
+
+
+def archive_finished_games(
+    session: Session,
+    season: str,
+    archive_dir: str = ARCHIVE_DIR,
+    run_vacuum: bool = True,
+) -> Tuple[List[int], bool]:
+    """Move every ``FINISHED`` game into the season archive.
+
+    Returns the archived game ids and whether the hot database was vacuumed.
+    Each game is appended to the archive file before it is deleted, one game per
+    transaction, so an interrupted run never loses data (at worst a game is
+    written twice and still present in the hot DB).
+    """
+    path = season_path(season, archive_dir)
+    os.makedirs(archive_dir, exist_ok=True)
+
+    game_ids = session.exec(
+        select(Game.id).where(Game.phase == GamePhase.FINISHED).order_by(Game.id)
+    ).all()
+    for game_id in game_ids:
+        record = _game_record(session, session.get(Game, game_id))
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        _delete_game(session, record)
+        session.commit()
+
+    vacuumed = False
+    if game_ids and run_vacuum:
+        session.close()
+        vacuumed = vacuum()
+    return game_ids, vacuumed
+
+
+def _iter_result_batches(game_id: int) -> Iterator[List[tuple]]:
+    """Yield a game's result rows in batches, each read in its own short session.
+
+    Holding one cursor open for a whole download would keep a read transaction
+    alive and, with SQLite's rollback journal, block answer submissions while a
+    slow client streams the export.
+    """
+    after = None
+    while True:
+        with get_session() as session:
+            rows = crud.list_game_results(session, game_id, EXPORT_BATCH_SIZE, after)
+        if not rows:
+            return
+        after = rows[-1][-4:]
+        yield [row[:-4] for row in rows]
+
+
+def iter_results_csv(game_id: int) -> Iterator[str]:
+    """Yield a game's results as CSV, one batch of rows at a time."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(RESULT_COLUMNS)
+    yield buffer.getvalue()
+    for rows in _iter_result_batches(game_id):
+        buffer.seek(0)
+        buffer.truncate()
+        writer.writerows(rows)
+        yield buffer.getvalue()
+
+
+def iter_results_jsonl(game_id: int) -> Iterator[str]:
+    """Yield a game's results as JSON lines, one batch of rows at a time."""
+    for rows in _iter_result_batches(game_id):
+        yield "".join(json.dumps(dict(zip(RESULT_COLUMNS, row))) + "\n" for row in rows)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Archive finished games into a season file.")
+    parser.add_argument("--season", required=True, help="Season name, e.g. 2026-autumn")
+    parser.add_argument("--archive-dir", default=ARCHIVE_DIR)
+    parser.add_argument("--no-vacuum", action="store_true", help="Skip VACUUM of the hot database")
+    args = parser.parse_args()
+
+    with get_session() as session:
+        game_ids, vacuumed = archive_finished_games(
+            session,
+            season=args.season,
+            archive_dir=args.archive_dir,
+            run_vacuum=not args.no_vacuum,
+        )
+        remaining = session.exec(select(func.count(Game.id))).one()
+    print(f"Archived {len(game_ids)} game(s) to {season_path(args.season, args.archive_dir)}; {remaining} left in trivia.db")
+    if game_ids and not args.no_vacuum and not vacuumed:
+        print("VACUUM skipped because the database is in use; re-run later to reclaim space")
+
+
+if __name__ == "__main__":
+    main()
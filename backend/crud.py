@@ -1,12 +1,16 @@
-from typing import List, Optional
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
+from sqlalchemy import case, func, tuple_
+from sqlalchemy.orm import joinedload
 from sqlmodel import Session, select
 
+from backend import question_stats
 from backend.models import (
     AnswerSubmission,
     Game,
     GamePhase,
     Question,
+    QuestionStats,
     Round,
     Team,
     User,
@@ -14,6 +18,54 @@ from backend.models import (
 )
 
 
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 500
+
+
+# Pagination
+#
+# List queries use keyset pagination: ``after`` is the full sort key of the last
+# row of the previous page, and the next page starts right after it. This keeps
+# every page an index range scan instead of an ever-growing OFFSET, and a page
+# never depends on the cursor row still existing or still matching the filters.
+#
+# Passing ``columns`` selects just those columns as plain rows instead of ORM
+# instances, for the lean serialization path in backend.serialization. Such rows
+# carry their sort key as extra trailing columns, the next page's ``after``.
+
+
+def _select(model, columns: Optional[Sequence] = None):
+    return select(*columns) if columns else select(model)
+
+
+def _keyset_page(
+    session: Session,
+    query,
+    order_by,
+    limit: int,
+    after: Optional[Sequence],
+    columns: Optional[Sequence] = None,
+    descending: bool = False,
+):
+    """Return the page of ``query`` that follows the sort key ``after``.
+
+    The last ``order_by`` column must be unique so the key identifies one position.
+    """
+    if after is not None:
+        if len(after) != len(order_by):
+            raise ValueError("Invalid cursor")
+        if len(order_by) == 1:
+            key, bound = order_by[0], after[0]
+        else:
+            key, bound = tuple_(*order_by), tuple_(*after)
+        query = query.where(key < bound if descending else key > bound)
+    if columns:
+        query = query.add_columns(*order_by)
+    if descending:
+        order_by = [column.desc() for column in order_by]
+    return session.exec(query.order_by(*order_by).limit(limit)).all()
+
+
 # Game operations
 
 def create_game(session: Session, title: str) -> Game:
@@ -34,6 +86,16 @@ def get_game(session: Session, game_id: int) -> Optional[Game]:
     return session.get(Game, game_id)
 
 
+def list_games(
+    session: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[Sequence] = None,
+    columns: Optional[Sequence] = None,
+) -> List[Game]:
+    # Newest first, so the games a host is working with are always on the first page
+    return _keyset_page(session, _select(Game, columns), [Game.id], limit, after, columns, descending=True)
+
+
 def set_game_phase(session: Session, game: Game, phase: GamePhase) -> Game:
     game.phase = phase
     session.add(game)
@@ -52,8 +114,13 @@ def create_team(session: Session, name: str) -> Team:
     return team
 
 
-def list_teams(session: Session) -> List[Team]:
-    return session.exec(select(Team)).all()
+def list_teams(
+    session: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[Sequence] = None,
+    columns: Optional[Sequence] = None,
+) -> List[Team]:
+    return _keyset_page(session, _select(Team, columns), [Team.id], limit, after, columns)
 
 
 # User operations
@@ -66,8 +133,13 @@ def create_user(session: Session, name: str, role: UserRole, team_id: Optional[i
     return user
 
 
-def list_users(session: Session) -> List[User]:
-    return session.exec(select(User)).all()
+def list_users(
+    session: Session,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[Sequence] = None,
+    columns: Optional[Sequence] = None,
+) -> List[User]:
+    return _keyset_page(session, _select(User, columns), [User.id], limit, after, columns)
 
 
 # Question operations
@@ -88,13 +160,31 @@ def create_question(
         media_url=media_url,
     )
     session.add(question)
+    session.flush()
+    session.add(QuestionStats(question_id=question.id))
     session.commit()
     session.refresh(question)
     return question
 
 
-def list_questions_for_round(session: Session, round_id: int) -> List[Question]:
-    return session.exec(select(Question).where(Question.round_id == round_id).order_by(Question.order)).all()
+def get_question_with_round(session: Session, question_id: int) -> Optional[Question]:
+    """Load a question together with its round and game in a single query."""
+    return session.get(
+        Question,
+        question_id,
+        options=[joinedload(Question.round).joinedload(Round.game)],
+    )
+
+
+def list_questions_for_round(
+    session: Session,
+    round_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[Sequence] = None,
+    columns: Optional[Sequence] = None,
+) -> List[Question]:
+    query = _select(Question, columns).where(Question.round_id == round_id)
+    return _keyset_page(session, query, [Question.order, Question.id], limit, after, columns)
 
 
 def update_question(session: Session, question_id: int, **fields) -> Question:
@@ -124,55 +214,140 @@ def submit_answer(
 
     # Mark correctness
     question = session.get(Question, question_id)
-    if question and question.answer.lower().strip() == answer_text.lower().strip():
+    if question and question_stats.normalise_answer(question.answer) == question_stats.normalise_answer(answer_text):
         submission.is_correct = True
     else:
         submission.is_correct = False
+    question_stats.record_attempt(session, question_id, answer_text, submission.is_correct)
 
     session.commit()
     session.refresh(submission)
     return submission
 
 
-def leaderboard_for_game(session: Session, game_id: int):
+def grade_submission(session: Session, submission_id: int, is_correct: bool) -> AnswerSubmission:
+    """Override the automatic grading of a submission (e.g. to accept a spelling variant)."""
+    submission = session.get(AnswerSubmission, submission_id)
+    if not submission:
+        raise ValueError("Submission not found")
+    if submission.is_correct != is_correct:
+        was_correct = submission.is_correct
+        submission.is_correct = is_correct
+        session.add(submission)
+        question_stats.record_regrade(session, submission.question_id, was_correct, is_correct)
+        session.commit()
+        session.refresh(submission)
+    return submission
+
+
+def leaderboard_for_game(session: Session, game_id: int) -> List[Dict[str, Any]]:
     """Compute leaderboard as total correct answers per team for the game."""
+    points = func.sum(case((AnswerSubmission.is_correct, 1), else_=0)).label("points")
     query = (
         select(
-            Team.id,
-            Team.name,
-            AnswerSubmission.is_correct,
+            Team.id.label("team_id"),
+            Team.name.label("team_name"),
+            points,
         )
         .join(AnswerSubmission, AnswerSubmission.team_id == Team.id)
         .join(Question, Question.id == AnswerSubmission.question_id)
         .join(Round, Round.id == Question.round_id)
         .where(Round.game_id == game_id)
+        .group_by(Team.id, Team.name)
+        .order_by(points.desc(), Team.id)
     )
-    rows = session.exec(query).all()
+    return [row._asdict() for row in session.exec(query)]
 
-    points = {}
-    for team_id, team_name, is_correct in rows:
-        if team_id not in points:
-            points[team_id] = {
-                "team_name": team_name,
-                "points": 0,
-            }
-        if is_correct:
-            points[team_id]["points"] += 1
 
-    leaderboard = sorted(points.items(), key=lambda item: item[1]["points"], reverse=True)
-    return leaderboard
+# Question helper for host
 
+def list_questions_for_game(
+    session: Session,
+    game_id: int,
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[Sequence] = None,
+    columns: Optional[Sequence] = None,
+) -> List[Question]:
+    query = _select(Question, columns).join(Round, Round.id == Question.round_id).where(Round.game_id == game_id)
+    return _keyset_page(session, query, [Question.round_id, Question.order, Question.id], limit, after, columns)
 
-# Question helper for host
 
-def list_questions_for_game(session: Session, game_id: int) -> List[Question]:
+QUESTION_SORTS = ("id", "hardest", "easiest")
+
+
+def search_questions(
+    session: Session,
+    text: Optional[str] = None,
+    min_correct_rate: Optional[float] = None,
+    max_correct_rate: Optional[float] = None,
+    min_attempts: Optional[int] = None,
+    sort: str = "id",
+    limit: int = DEFAULT_PAGE_SIZE,
+    after: Optional[Sequence] = None,
+    columns: Optional[Sequence] = None,
+) -> List[Question]:
+    """Search the question bank, optionally filtered and sorted by difficulty.
+
+    ``hardest``/``easiest`` sort on the indexed ``QuestionStats.correct_rate`` and
+    therefore only return questions that have been answered at least once.
+    """
+    if sort not in QUESTION_SORTS:
+        raise ValueError(f"Sort must be one of {', '.join(QUESTION_SORTS)}")
+    query = _select(Question, columns).outerjoin(QuestionStats, QuestionStats.question_id == Question.id)
+    if text:
+        query = query.where(Question.text.contains(text))
+    if min_correct_rate is not None:
+        query = query.where(QuestionStats.correct_rate >= min_correct_rate)
+    if max_correct_rate is not None:
+        query = query.where(QuestionStats.correct_rate <= max_correct_rate)
+    if min_attempts is not None:
+        query = query.where(QuestionStats.attempts >= min_attempts)
+    if sort == "id":
+        return _keyset_page(session, query, [Question.id], limit, after, columns)
+    query = query.where(QuestionStats.correct_rate.is_not(None))
+    order_by = [QuestionStats.correct_rate, Question.id]
+    return _keyset_page(session, query, order_by, limit, after, columns, descending=sort == "easiest")
+
+
+def get_question_stats(session: Session, question_id: int) -> Optional[QuestionStats]:
+    return session.get(QuestionStats, question_id)
+
+
+def list_game_results(
+    session: Session,
+    game_id: int,
+    limit: int = 500,
+    after: Optional[Tuple] = None,
+) -> List[Tuple]:
+    """Return one page of a game's results, one row per submission.
+
+    Rows are ordered by (round number, question order, team id, submission id);
+    that sort key is the last four columns of each row, and passing the last
+    row's key as ``after`` fetches the next page.
+    """
+    order_by = [Round.number, Question.order, Team.id, AnswerSubmission.id]
     query = (
-        select(Question)
-        .join(Round, Round.id == Question.round_id)
+        select(
+            Round.game_id,
+            Round.number,
+            Question.order,
+            Question.id,
+            Question.text,
+            Question.answer,
+            Team.id,
+            Team.name,
+            AnswerSubmission.answer_text,
+            AnswerSubmission.is_correct,
+            *order_by,
+        )
+        .join(Question, Question.round_id == Round.id)
+        .join(AnswerSubmission, AnswerSubmission.question_id == Question.id)
+        .join(Team, Team.id == AnswerSubmission.team_id)
         .where(Round.game_id == game_id)
-        .order_by(Question.round_id, Question.order)
     )
-    return session.exec(query).all()
+    if after is not None:
+        query = query.where(tuple_(*order_by) > tuple_(*after))
+    return [tuple(row) for row in session.exec(query.order_by(*order_by).limit(limit))]
 
 
 def set_current_question(session: Session, game: Game, question_id: int):
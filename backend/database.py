@@ -1,8 +1,12 @@
-from sqlmodel import Session, SQLModel, create_engine
+import os
 from contextlib import contextmanager
 from typing import Generator
 
-DATABASE_URL = "sqlite:///./trivia.db"
+from sqlalchemy import Table
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, SQLModel, create_engine
+
+DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./trivia.db")
 
 engine = create_engine(DATABASE_URL, echo=False)
 
@@ -11,6 +15,31 @@ def init_db() -> None:
     """Create all database tables."""
     import backend.models  # noqa: F401  # Ensure models are registered before create_all
     SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.tables.values():
+            _relax_not_null(conn, table)
+    # create_all skips tables that already exist, so add indexes introduced later
+    for table in SQLModel.metadata.tables.values():
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
+
+
+def _relax_not_null(conn: Connection, table: Table) -> None:
+    """Rebuild ``table`` if a column that became nullable is still NOT NULL on disk.
+
+    SQLite cannot drop a NOT NULL constraint in place, so the rows are copied
+    aside, the table is recreated from the model and the rows are copied back.
+    """
+    on_disk = {row[1]: row[3] for row in conn.exec_driver_sql(f'PRAGMA table_info("{table.name}")')}
+    if not any(column.nullable and on_disk.get(column.name) for column in table.columns):
+        return
+    backup = f"_rebuild_{table.name}"
+    names = ", ".join(f'"{column.name}"' for column in table.columns if column.name in on_disk)
+    conn.exec_driver_sql(f'CREATE TABLE "{backup}" AS SELECT * FROM "{table.name}"')
+    table.drop(conn)
+    table.create(conn)
+    conn.exec_driver_sql(f'INSERT INTO "{table.name}" ({names}) SELECT {names} FROM "{backup}"')
+    conn.exec_driver_sql(f'DROP TABLE "{backup}"')
 
 
 @contextmanager
@@ -1,18 +1,26 @@
-from typing import List
+from typing import Callable, List, Optional
 import os
 from datetime import datetime
 
-from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request, UploadFile, File
+from fastapi import Depends, FastAPI, HTTPException, WebSocket, WebSocketDisconnect, Request, Response, UploadFile, File, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from fastapi.routing import APIRoute
 from fastapi.staticfiles import StaticFiles
-from sqlmodel import Session, select
+from sqlmodel import Session
 from fastapi.encoders import jsonable_encoder
 
 from backend import crud, models, schemas
-from backend.database import get_session, init_db
+from backend.database import engine, get_session, init_db
 from backend import wifi
+from backend import archive
+from backend import profiling
+from backend.serialization import FastJSONResponse, columns_for, decode_cursor, encode_cursor, rows_to_dicts
 
 app = FastAPI(title="Local Trivia Game")
+# Must be set before any route is declared so every endpoint can be profiled
+app.router.route_class = profiling.ProfiledRoute
+profiling.install_sql_capture(engine)
 
 origins = [
     "*",  # For local deployment only; you might restrict this in production
@@ -40,6 +48,24 @@ def on_startup() -> None:
     init_db()
 
 
+async def broadcast_wifi_clients(status: dict) -> None:
+    # /ws reaches every player, so only the count goes out; MACs stay on /wifi/status
+    await manager.broadcast({"type": "wifi_clients", "count": len(status["clients"])})
+
+
+wifi_poller = wifi.WifiStatusPoller(on_change=broadcast_wifi_clients)
+
+
+@app.on_event("startup")
+async def start_wifi_poller() -> None:
+    wifi_poller.start()
+
+
+@app.on_event("shutdown")
+async def stop_wifi_poller() -> None:
+    await wifi_poller.stop()
+
+
 # Dependency
 
 def get_db_session():
@@ -47,6 +73,33 @@ def get_db_session():
         yield session
 
 
+class Page:
+    """Keyset pagination parameters shared by the list endpoints."""
+
+    def __init__(
+        self,
+        limit: int = Query(crud.DEFAULT_PAGE_SIZE, ge=1, le=crud.MAX_PAGE_SIZE),
+        after: Optional[str] = Query(None, description="X-Next-Cursor header of the previous page"),
+    ):
+        self.limit = limit
+        self.after = after
+
+    def respond(self, list_fn: Callable[..., list], columns: list, *args, **kwargs) -> FastJSONResponse:
+        """Fetch this page as plain ``columns`` rows and encode them directly.
+
+        The next cursor, the last row's sort key, is advertised in
+        ``X-Next-Cursor`` when the page is full.
+        """
+        try:
+            after = decode_cursor(self.after) if self.after is not None else None
+            rows = list_fn(*args, limit=self.limit, after=after, columns=columns, **kwargs)
+        except ValueError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        width = len(columns)
+        headers = {"X-Next-Cursor": encode_cursor(rows[-1][width:])} if len(rows) == self.limit else None
+        return FastJSONResponse(rows_to_dicts(rows, width), headers=headers)
+
+
 # -- Game endpoints --
 
 
@@ -82,9 +135,8 @@ async def update_phase(game_id: int, update: schemas.PhaseUpdate, session: Sessi
 
 
 @app.get("/games", response_model=List[schemas.GameRead])
-def list_games(session: Session = Depends(get_db_session)):
-    games = session.exec(select(models.Game)).all()
-    return games
+def list_games(page: Page = Depends(), session: Session = Depends(get_db_session)):
+    return page.respond(crud.list_games, columns_for(schemas.GameRead, models.Game), session)
 
 
 # -- Team endpoints --
@@ -97,9 +149,8 @@ def create_team(team_in: schemas.TeamCreate, session: Session = Depends(get_db_s
 
 
 @app.get("/teams", response_model=List[schemas.TeamRead])
-def list_teams(session: Session = Depends(get_db_session)):
-    teams = crud.list_teams(session)
-    return teams
+def list_teams(page: Page = Depends(), session: Session = Depends(get_db_session)):
+    return page.respond(crud.list_teams, columns_for(schemas.TeamRead, models.Team), session)
 
 
 # -- User endpoints --
@@ -117,9 +168,8 @@ def create_user(user_in: schemas.UserCreate, session: Session = Depends(get_db_s
 
 
 @app.get("/users", response_model=List[schemas.UserRead])
-def list_users(session: Session = Depends(get_db_session)):
-    users = crud.list_users(session)
-    return users
+def list_users(page: Page = Depends(), session: Session = Depends(get_db_session)):
+    return page.respond(crud.list_users, columns_for(schemas.UserRead, models.User), session)
 
 
 # -- Question endpoints --
@@ -139,8 +189,41 @@ def create_question(question_in: schemas.QuestionCreate, session: Session = Depe
 
 
 @app.get("/rounds/{round_id}/questions", response_model=List[schemas.QuestionRead])
-def list_round_questions(round_id: int, session: Session = Depends(get_db_session)):
-    return crud.list_questions_for_round(session, round_id)
+def list_round_questions(round_id: int, page: Page = Depends(), session: Session = Depends(get_db_session)):
+    return page.respond(crud.list_questions_for_round, columns_for(schemas.QuestionRead, models.Question), session, round_id)
+
+
+@app.get("/questions", response_model=List[schemas.QuestionWithStats])
+def search_questions(
+    q: Optional[str] = None,
+    min_correct_rate: Optional[float] = Query(None, ge=0, le=1),
+    max_correct_rate: Optional[float] = Query(None, ge=0, le=1),
+    min_attempts: Optional[int] = Query(None, ge=0),
+    sort: str = Query("id", description="id, hardest or easiest"),
+    page: Page = Depends(),
+    session: Session = Depends(get_db_session),
+):
+    return page.respond(
+        crud.search_questions,
+        columns_for(schemas.QuestionWithStats, models.Question, models.QuestionStats),
+        session,
+        text=q,
+        min_correct_rate=min_correct_rate,
+        max_correct_rate=max_correct_rate,
+        min_attempts=min_attempts,
+        sort=sort,
+    )
+
+
+@app.get("/questions/{question_id}/stats", response_model=schemas.QuestionStatsRead)
+def read_question_stats(question_id: int, request: Request, session: Session = Depends(get_db_session)):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    stats = crud.get_question_stats(session, question_id)
+    if not stats:
+        raise HTTPException(status_code=404, detail="No statistics for this question")
+    return stats
 
 
 # -- Answer submission endpoints --
@@ -148,6 +231,13 @@ def list_round_questions(round_id: int, session: Session = Depends(get_db_sessio
 
 @app.post("/answers", response_model=schemas.AnswerRead)
 async def submit_answer(answer_in: schemas.AnswerSubmit, session: Session = Depends(get_db_session)):
+    question = crud.get_question_with_round(session, answer_in.question_id)
+    if not question:
+        raise HTTPException(status_code=404, detail="Question not found")
+    if question.round is None:
+        raise HTTPException(status_code=409, detail="Question belongs to an archived game")
+    game_id = question.round.game_id
+
     submission = crud.submit_answer(
         session,
         question_id=answer_in.question_id,
@@ -156,41 +246,181 @@ async def submit_answer(answer_in: schemas.AnswerSubmit, session: Session = Depe
     )
 
     # Compute and broadcast updated leaderboard
-    leaderboard_raw = crud.leaderboard_for_game(session, game_id=submission.question.round.game_id)
-    standings = [
-        schemas.LeaderboardEntry(
-            team_id=team_id,
-            team_name=data["team_name"],
-            points=data["points"],
-        )
-        for team_id, data in leaderboard_raw
-    ]
     await manager.broadcast(
         {
             "type": "leaderboard_update",
-            "game_id": submission.question.round.game_id,
-            "standings": jsonable_encoder(standings),
+            "game_id": game_id,
+            "standings": crud.leaderboard_for_game(session, game_id=game_id),
         }
     )
 
     return submission
 
 
+@app.put("/answers/{submission_id}/grade", response_model=schemas.AnswerRead)
+async def grade_answer(
+    submission_id: int,
+    grade: schemas.AnswerGrade,
+    request: Request,
+    session: Session = Depends(get_db_session),
+):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    try:
+        submission = crud.grade_submission(session, submission_id, grade.is_correct)
+    except ValueError as exc:
+        raise HTTPException(status_code=404, detail=str(exc))
+
+    game_id = crud.get_question_with_round(session, submission.question_id).round.game_id
+    await manager.broadcast(
+        {
+            "type": "leaderboard_update",
+            "game_id": game_id,
+            "standings": crud.leaderboard_for_game(session, game_id=game_id),
+        }
+    )
+    return submission
+
+
 # -- Leaderboard --
 
 
 @app.get("/games/{game_id}/leaderboard", response_model=schemas.Leaderboard)
 def get_leaderboard(game_id: int, session: Session = Depends(get_db_session)):
-    leaderboard_raw = crud.leaderboard_for_game(session, game_id)
-    standings = [
-        schemas.LeaderboardEntry(
-            team_id=team_id,
-            team_name=data["team_name"],
-            points=data["points"],
-        )
-        for team_id, data in leaderboard_raw
-    ]
-    return schemas.Leaderboard(game_id=game_id, standings=standings)
+    standings = crud.leaderboard_for_game(session, game_id)
+    return FastJSONResponse({"game_id": game_id, "standings": standings})
+
+
+# -- Results export and season archive --
+
+
+@app.get("/games/{game_id}/results/export")
+def export_game_results(
+    game_id: int,
+    request: Request,
+    format: str = "csv",
+    session: Session = Depends(get_db_session),
+):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if not crud.get_game(session, game_id):
+        raise HTTPException(status_code=404, detail="Game not found")
+    if format == "csv":
+        rows, media_type = archive.iter_results_csv(game_id), "text/csv"
+    elif format == "jsonl":
+        rows, media_type = archive.iter_results_jsonl(game_id), "application/x-ndjson"
+    else:
+        raise HTTPException(status_code=400, detail="Format must be 'csv' or 'jsonl'")
+    headers = {"Content-Disposition": f'attachment; filename="game-{game_id}-results.{format}"'}
+    return StreamingResponse(rows, media_type=media_type, headers=headers)
+
+
+@app.post("/archive", response_model=schemas.ArchiveResult)
+def archive_season(archive_in: schemas.ArchiveRequest, request: Request, session: Session = Depends(get_db_session)):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    try:
+        game_ids, vacuumed = archive.archive_finished_games(session, season=archive_in.season)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return schemas.ArchiveResult(season=archive_in.season, archived_game_ids=game_ids, vacuumed=vacuumed)
+
+
+@app.get("/archive/{season}")
+def download_season(season: str, request: Request):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    try:
+        path = archive.season_path(season)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Season not found")
+    return FileResponse(path, media_type="application/x-ndjson", filename=f"{season}.jsonl")
+
+
+# -- Profiling (host only) --
+
+
+@app.get("/profiling")
+def list_profiles(request: Request):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    profiler = profiling.profiler
+    return {
+        "slow_ms": profiler.slow_ms,
+        "armed": {route: {"mode": mode, "remaining": remaining} for route, (mode, remaining) in dict(profiler.armed).items()},
+        "records": [capture.summary() for capture in reversed(list(profiler.records))],
+    }
+
+
+@app.post("/profiling/arm")
+def arm_profile(arm: schemas.ProfileArm, request: Request):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    if arm.route not in {route.path for route in app.routes if isinstance(route, APIRoute)}:
+        raise HTTPException(status_code=404, detail="Route not found")
+    profiling.profiler.arm_route(arm.route, arm.count, arm.mode)
+    return {"status": "armed", "route": arm.route, "count": arm.count, "mode": arm.mode}
+
+
+@app.post("/profiling/loop")
+async def profile_loop(arm: schemas.LoopProfileArm, request: Request):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    try:
+        capture = profiling.profiler.arm_loop(arm.seconds, arm.mode)
+    except ValueError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    return {"status": "armed", "id": capture.id, "seconds": arm.seconds, "mode": arm.mode}
+
+
+@app.get("/profiling/{capture_id}")
+def read_profile(capture_id: int, request: Request):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    capture = profiling.profiler.get(capture_id)
+    if not capture:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    return capture.summary(with_sql=True)
+
+
+@app.get("/profiling/{capture_id}/download")
+def download_profile(capture_id: int, request: Request, format: str = "pstats"):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    capture = profiling.profiler.get(capture_id)
+    if not capture:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "pstats":
+        if capture.pstats is None:
+            raise HTTPException(status_code=404, detail="No cProfile data for this capture")
+        headers = {"Content-Disposition": f'attachment; filename="profile-{capture_id}.pstats"'}
+        return Response(capture.pstats, media_type="application/octet-stream", headers=headers)
+    if format == "collapsed":
+        if not capture.samples:
+            raise HTTPException(status_code=404, detail="No stack samples for this capture")
+        headers = {"Content-Disposition": f'attachment; filename="profile-{capture_id}.collapsed"'}
+        return PlainTextResponse(capture.collapsed(), headers=headers)
+    raise HTTPException(status_code=400, detail="Format must be 'pstats' or 'collapsed'")
+
+
+@app.delete("/profiling")
+def clear_profiles(request: Request):
+    token = request.headers.get("X-Host-Token")
+    if token != HOST_TOKEN:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    profiling.profiler.clear()
+    return {"status": "cleared"}
 
 
 # -- WebSocket for live updates --
@@ -237,9 +467,11 @@ async def broadcast_question(question_id: int, request: Request, session: Sessio
     if token != HOST_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
 
-    question = session.get(models.Question, question_id)
+    question = crud.get_question_with_round(session, question_id)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
+    if question.round is None:
+        raise HTTPException(status_code=409, detail="Question belongs to an archived game")
 
     # Prepare payload with essential info
     payload = {
@@ -265,8 +497,8 @@ async def broadcast_question(question_id: int, request: Request, session: Sessio
 
 
 @app.get("/games/{game_id}/questions", response_model=List[schemas.QuestionRead])
-def list_game_questions(game_id: int, session: Session = Depends(get_db_session)):
-    return crud.list_questions_for_game(session, game_id)
+def list_game_questions(game_id: int, page: Page = Depends(), session: Session = Depends(get_db_session)):
+    return page.respond(crud.list_questions_for_game, columns_for(schemas.QuestionRead, models.Question), session, game_id)
 
 
 # Endpoint to get current question for a game (for late joiners)
@@ -333,27 +565,30 @@ def update_question(
 
 
 @app.post("/wifi/start")
-def wifi_start(request: Request):
+async def wifi_start(request: Request):
     token = request.headers.get("X-Host-Token")
     if token != HOST_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    success = wifi.start_ap()
+    success = await wifi.start_ap(wifi_poller.runner)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to start AP")
-    return wifi.status_ap()
+    return await wifi_poller.refresh()
 
 
 @app.post("/wifi/stop")
-def wifi_stop(request: Request):
+async def wifi_stop(request: Request):
     token = request.headers.get("X-Host-Token")
     if token != HOST_TOKEN:
         raise HTTPException(status_code=401, detail="Unauthorized")
-    success = wifi.stop_ap()
+    success = await wifi.stop_ap(wifi_poller.runner)
     if not success:
         raise HTTPException(status_code=500, detail="Failed to stop AP")
-    return wifi.status_ap()
+    return await wifi_poller.refresh()
 
 
 @app.get("/wifi/status")
-def wifi_status():
-    return wifi.status_ap() 
\ No newline at end of file
+async def wifi_status():
+    # Served from the background poller's cache; poll inline only when it is disabled
+    if not wifi_poller.running:
+        return await wifi_poller.refresh()
+    return wifi_poller.snapshot
@@ -1,8 +1,8 @@
-from __future__ import annotations
-
+from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
+from sqlalchemy import JSON, Column
 from sqlmodel import Field, Relationship, SQLModel
 
 
@@ -36,7 +36,7 @@ class User(SQLModel, table=True):
     name: str
     role: UserRole
 
-    team_id: Optional[int] = Field(default=None, foreign_key="team.id")
+    team_id: Optional[int] = Field(default=None, foreign_key="team.id", index=True)
     team: Optional[Team] = Relationship(back_populates="members")
 
 
@@ -53,7 +53,7 @@ class Game(SQLModel, table=True):
 
 class Round(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    game_id: int = Field(foreign_key="game.id")
+    game_id: int = Field(foreign_key="game.id", index=True)
     number: int  # 1-6
 
     game: Game = Relationship(back_populates="rounds")
@@ -62,22 +62,36 @@ class Round(SQLModel, table=True):
 
 class Question(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    round_id: int = Field(foreign_key="round.id")
+    # None once the question's game has been archived; it stays in the question bank
+    round_id: Optional[int] = Field(default=None, foreign_key="round.id", index=True)
     order: int  # 1-10
     text: str
     answer: str
     media_url: Optional[str] = None  # path to image / video on local file system or served URL
 
-    round: Round = Relationship(back_populates="questions")
+    round: Optional[Round] = Relationship(back_populates="questions")
     submissions: List["AnswerSubmission"] = Relationship(back_populates="question")
 
 
 class AnswerSubmission(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    question_id: int = Field(foreign_key="question.id")
-    team_id: int = Field(foreign_key="team.id")
+    question_id: int = Field(foreign_key="question.id", index=True)
+    team_id: int = Field(foreign_key="team.id", index=True)
     answer_text: str
     is_correct: Optional[bool] = None
 
     question: Question = Relationship(back_populates="submissions")
-    team: Team = Relationship(back_populates="submissions") 
\ No newline at end of file
+    team: Team = Relationship(back_populates="submissions") 
+
+
+class QuestionStats(SQLModel, table=True):
+    """Per-question answer statistics, maintained incrementally on every (re)grade."""
+
+    question_id: int = Field(foreign_key="question.id", primary_key=True)
+    attempts: int = Field(default=0, nullable=False)
+    correct_count: int = Field(default=0, nullable=False)
+    # correct_count / attempts, stored so difficulty sorts and filters can use an index
+    correct_rate: Optional[float] = Field(default=None, index=True)
+    # Normalised answer text -> count for the most frequent answers (approximate top-K)
+    top_answers: Dict[str, int] = Field(default_factory=dict, sa_column=Column(JSON, nullable=False))
+    last_used: Optional[datetime] = None
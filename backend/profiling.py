@@ -0,0 +1,325 @@
+"""On-demand request profiling and slow-request capture.
+
+The host can arm a capture for the next N requests to a route, or for T seconds
+of the event loop, in one of two modes:
+
+* ``cprofile`` - deterministic profile, downloadable as a ``.pstats`` file.
+* ``sample``   - stacks sampled from a background thread, downloadable as
+  collapsed stacks (one ``frame;frame;frame count`` line each, ready for
+  flamegraph tools).
+
+Independently of arming, every request slower than ``SLOW_REQUEST_MS`` is kept
+together with its SQL statements and the stacks sampled once it crossed the
+threshold. ``SLOW_REQUEST_MS=0`` turns that off; with nothing armed the
+per-request cost is then a couple of attribute checks.
+
+Sync endpoints run in the threadpool, so the route class wraps the endpoint to
+profile (or sample) the worker thread while it runs; async endpoints are
+covered on the event loop thread.
+"""
+
+import asyncio
+import cProfile
+import functools
+import inspect
+import itertools
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextvars import ContextVar
+from datetime import datetime
+from typing import Callable, Deque, Dict, List, Optional, Set, Tuple
+
+from fastapi.routing import APIRoute
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.schemas import ProfileMode
+
+SLOW_REQUEST_MS = float(os.environ.get("SLOW_REQUEST_MS", "1000"))
+SAMPLE_INTERVAL = 0.005  # seconds between stack samples
+MAX_RECORDS = 50
+MAX_SQL_STATEMENTS = 500
+
+
+class Capture:
+    """Profiling state for one request (or one event-loop window)."""
+
+    def __init__(self, capture_id: int, reason: str, route: str, method: str = "", path: str = "",
+                 mode: Optional[ProfileMode] = None):
+        self.id = capture_id
+        self.reason = reason  # "armed", "slow" or "loop"
+        self.route = route
+        self.method = method
+        self.path = path
+        self.mode = mode
+        self.started_at = datetime.utcnow()
+        self.started = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+        self.threads: Set[int] = {threading.get_ident()}
+        self.samples: Counter = Counter()
+        self.profiles: List[cProfile.Profile] = []
+        self.sql: List[Tuple[str, float]] = []
+        self.pstats: Optional[bytes] = None
+
+    def summary(self, with_sql: bool = False) -> dict:
+        data = {
+            "id": self.id,
+            "reason": self.reason,
+            "mode": self.mode,
+            "route": self.route,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at.isoformat(),
+            "duration_ms": self.duration_ms,
+            "sql_count": len(self.sql),
+            "sample_count": sum(self.samples.values()),
+            "has_pstats": self.pstats is not None,
+        }
+        if with_sql:
+            data["sql"] = [{"statement": statement, "ms": ms} for statement, ms in self.sql]
+        return data
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+
+_current: ContextVar[Optional[Capture]] = ContextVar("profiling_capture", default=None)
+
+
+def _collapse(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+def _enable(profile: cProfile.Profile) -> bool:
+    try:
+        profile.enable()
+    except ValueError:  # another profiler already owns this thread
+        return False
+    return True
+
+
+class Profiler:
+    def __init__(self, slow_ms: float = SLOW_REQUEST_MS):
+        self.slow_ms = slow_ms
+        self.armed: Dict[str, List] = {}  # route -> [mode, remaining]
+        self.records: Deque[Capture] = deque(maxlen=MAX_RECORDS)
+        self._inflight: Dict[int, Capture] = {}
+        self._loop_profiled = False  # cProfile hooks are per thread; one owner at a time
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+
+    # -- arming --
+
+    def arm_route(self, route: str, count: int, mode: ProfileMode) -> None:
+        with self._lock:
+            self.armed[route] = [mode, count]
+
+    def arm_loop(self, seconds: float, mode: ProfileMode) -> Capture:
+        """Profile the running event loop for ``seconds``; call from the loop thread."""
+        capture = Capture(next(self._ids), "loop", route="<event loop>", mode=mode)
+        if mode is ProfileMode.CPROFILE:
+            if self._loop_profiled:
+                raise ValueError("The event loop is already being profiled")
+            profile = cProfile.Profile()
+            if _enable(profile):
+                self._loop_profiled = True
+                capture.profiles.append(profile)
+        else:
+            self._register(capture)
+        asyncio.get_running_loop().call_later(seconds, self._finish_loop, capture)
+        return capture
+
+    def _finish_loop(self, capture: Capture) -> None:
+        if capture.profiles:
+            capture.profiles[0].disable()
+            self._loop_profiled = False
+        self._finish(capture, keep=True)
+
+    def clear(self) -> None:
+        with self._lock:
+            self.armed.clear()
+            self.records.clear()
+
+    def get(self, capture_id: int) -> Optional[Capture]:
+        return next((capture for capture in self.records if capture.id == capture_id), None)
+
+    # -- request lifecycle --
+
+    def begin(self, route: str, method: str, path: str) -> Optional[Capture]:
+        if not self.armed and self.slow_ms <= 0:
+            return None
+        mode = None
+        if self.armed:
+            with self._lock:
+                entry = self.armed.get(route)
+                if entry is not None:
+                    mode = entry[0]
+                    entry[1] -= 1
+                    if entry[1] <= 0:
+                        del self.armed[route]
+        if mode is None and self.slow_ms <= 0:
+            return None
+        capture = Capture(next(self._ids), "armed" if mode else "slow", route, method, path, mode)
+        self._register(capture)
+        return capture
+
+    def end(self, capture: Capture) -> None:
+        elapsed_ms = (time.perf_counter() - capture.started) * 1000
+        self._finish(capture, keep=capture.mode is not None or elapsed_ms >= self.slow_ms)
+
+    def _register(self, capture: Capture) -> None:
+        with self._lock:
+            was_idle = not self._inflight
+            self._inflight[capture.id] = capture
+            if self._sampler is None:
+                self._sampler = threading.Thread(target=self._sample_forever, name="profiling-sampler", daemon=True)
+                self._sampler.start()
+        if was_idle or capture.mode is ProfileMode.SAMPLE:
+            self._wake.set()
+
+    def _finish(self, capture: Capture, keep: bool) -> None:
+        with self._lock:
+            self._inflight.pop(capture.id, None)
+        if not keep:
+            return
+        capture.duration_ms = round((time.perf_counter() - capture.started) * 1000, 3)
+        if capture.profiles:
+            stats = pstats.Stats(capture.profiles[0])
+            for profile in capture.profiles[1:]:
+                stats.add(profile)
+            capture.pstats = marshal.dumps(stats.stats)
+            capture.profiles = []
+        self.records.append(capture)
+
+    # -- sampling --
+
+    def _sample_forever(self) -> None:
+        while True:
+            with self._lock:
+                inflight = list(self._inflight.values())
+            if not inflight:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            now = time.perf_counter()
+            slow_s = self.slow_ms / 1000
+            due = [
+                capture
+                for capture in inflight
+                if capture.mode is ProfileMode.SAMPLE
+                or (capture.mode is None and self.slow_ms > 0 and now - capture.started >= slow_s)
+            ]
+            if due:
+                frames = sys._current_frames()
+                for capture in due:
+                    for ident in tuple(capture.threads):
+                        frame = frames.get(ident)
+                        if frame is not None:
+                            capture.samples[_collapse(frame)] += 1
+                del frames
+                time.sleep(SAMPLE_INTERVAL)
+                continue
+            # Nothing to sample yet: sleep until the oldest request would turn slow
+            deadline = min(capture.started for capture in inflight) + slow_s
+            self._wake.wait(timeout=max(deadline - now, SAMPLE_INTERVAL))
+            self._wake.clear()
+
+
+profiler = Profiler()
+
+
+def install_sql_capture(engine: Engine) -> None:
+    """Record statements and their timings into the active capture, if any."""
+
+    # The start time lives on the per-statement execution context, so a failing
+    # statement leaves nothing behind on the pooled connection
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            context.profiling_started = time.perf_counter()
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        capture = _current.get()
+        started = getattr(context, "profiling_started", None)
+        if capture is None or started is None:
+            return
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        if len(capture.sql) < MAX_SQL_STATEMENTS:
+            capture.sql.append((statement, round(elapsed_ms, 3)))
+
+
+def _wrap_sync_endpoint(endpoint: Callable) -> Callable:
+    """Profile the threadpool worker that runs a sync endpoint."""
+
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        capture = _current.get()
+        if capture is None:
+            return endpoint(*args, **kwargs)
+        threads, capture.threads = capture.threads, {threading.get_ident()}
+        profile = None
+        if capture.mode is ProfileMode.CPROFILE:
+            profile = cProfile.Profile()
+            if _enable(profile):
+                capture.profiles.append(profile)
+            else:
+                profile = None
+        try:
+            return endpoint(*args, **kwargs)
+        finally:
+            if profile is not None:
+                profile.disable()
+            capture.threads = threads
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that reports each request to the module-level ``profiler``."""
+
+    def __init__(self, path: str, endpoint: Callable, **kwargs):
+        if not inspect.iscoroutinefunction(endpoint):
+            endpoint = _wrap_sync_endpoint(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+        route = self.path
+        is_async = inspect.iscoroutinefunction(self.endpoint)
+
+        async def profiled_handler(request):
+            capture = profiler.begin(route, request.method, request.url.path)
+            if capture is None:
+                return await handler(request)
+            token = _current.set(capture)
+            profile = None
+            if capture.mode is ProfileMode.CPROFILE and is_async and not profiler._loop_profiled:
+                profile = cProfile.Profile()
+                if _enable(profile):
+                    profiler._loop_profiled = True
+                    capture.profiles.append(profile)
+                else:
+                    profile = None
+            try:
+                return await handler(request)
+            finally:
+                if profile is not None:
+                    profile.disable()
+                    profiler._loop_profiled = False
+                _current.reset(token)
+                profiler.end(capture)
+
+        return profiled_handler
@@ -0,0 +1,152 @@
+"""Incrementally maintained per-question statistics.
+
+Grading a submission bumps the question's ``QuestionStats`` row in the same
+transaction, so difficulty lookups never have to aggregate ``AnswerSubmission``.
+For databases that predate the table, rebuild everything once with::
+
+    python -m backend.question_stats
+"""
+
+from collections import Counter
+from datetime import datetime
+from typing import Dict, Optional
+
+from sqlalchemy import Float, case, cast, delete, func, update
+from sqlmodel import Session, select
+
+from backend.database import get_session, init_db
+from backend.models import AnswerSubmission, Question, QuestionStats
+
+TOP_ANSWERS = 10
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def normalise_answer(text: str) -> str:
+    return text.lower().strip()
+
+
+def _correct_rate(stats: QuestionStats) -> Optional[float]:
+    return stats.correct_count / stats.attempts if stats.attempts else None
+
+
+def _bump_top_answers(top_answers: Dict[str, int], answer: str) -> Dict[str, int]:
+    """Count ``answer`` in a bounded histogram (space-saving top-K).
+
+    When the histogram is full, an unseen answer replaces the least frequent
+    entry and inherits its count, so heavy hitters are never under-counted.
+    """
+    counts = dict(top_answers)
+    if answer in counts or len(counts) < TOP_ANSWERS:
+        counts[answer] = counts.get(answer, 0) + 1
+    else:
+        evicted = min(counts, key=counts.get)
+        counts[answer] = counts.pop(evicted) + 1
+    return counts
+
+
+def _get_or_create(session: Session, question_id: int) -> QuestionStats:
+    stats = session.get(QuestionStats, question_id)
+    if stats is None:
+        stats = QuestionStats(question_id=question_id)
+    return stats
+
+
+def record_attempt(session: Session, question_id: int, answer_text: str, is_correct: bool) -> QuestionStats:
+    """Account for a newly graded submission. The caller commits."""
+    # Flush the submission first so SQLite holds the write lock for the read-modify-write below
+    session.flush()
+    stats = _get_or_create(session, question_id)
+    stats.attempts += 1
+    stats.correct_count += int(is_correct)
+    stats.correct_rate = _correct_rate(stats)
+    stats.top_answers = _bump_top_answers(stats.top_answers, normalise_answer(answer_text))
+    stats.last_used = datetime.utcnow()
+    session.add(stats)
+    return stats
+
+
+def record_regrade(session: Session, question_id: int, was_correct: Optional[bool], is_correct: bool) -> None:
+    """Account for a submission whose correctness changed. The caller commits.
+
+    A single UPDATE applies the change, so a concurrent grade can't be lost
+    between reading and writing the count. Submissions from before the
+    statistics table were never counted, so a question without recorded
+    attempts is left alone until it is backfilled; the count is also kept
+    within ``0..attempts`` for partially counted history.
+    """
+    delta = int(is_correct) - int(bool(was_correct))
+    correct_count = func.min(func.max(QuestionStats.correct_count + delta, 0), QuestionStats.attempts)
+    session.execute(
+        update(QuestionStats)
+        .where(QuestionStats.question_id == question_id, QuestionStats.attempts > 0)
+        .values(correct_count=correct_count, correct_rate=cast(correct_count, Float) / QuestionStats.attempts)
+    )
+
+
+def backfill(session: Session) -> int:
+    """Rebuild the statistics of every question still in a game from its submissions.
+
+    Questions of archived games keep their statistics, since their submissions
+    have moved to the season archive. Returns the number of questions written.
+    ``last_used`` is left empty because historical submissions carry no timestamp.
+    """
+    live_ids = select(Question.id).where(Question.round_id.is_not(None))
+    session.execute(delete(QuestionStats).where(QuestionStats.question_id.in_(live_ids)))
+
+    totals = {
+        question_id: (attempts, correct)
+        for question_id, attempts, correct in session.exec(
+            select(
+                AnswerSubmission.question_id,
+                func.count(AnswerSubmission.id),
+                func.sum(case((AnswerSubmission.is_correct, 1), else_=0)),
+            ).group_by(AnswerSubmission.question_id)
+        )
+    }
+
+    # Stream distinct (question, answer) counts ordered by question so only one histogram is built at a time
+    answer_rows = session.exec(
+        select(AnswerSubmission.question_id, AnswerSubmission.answer_text, func.count(AnswerSubmission.id))
+        .group_by(AnswerSubmission.question_id, AnswerSubmission.answer_text)
+        .order_by(AnswerSubmission.question_id)
+        .execution_options(yield_per=BACKFILL_BATCH_SIZE)
+    )
+    top_answers: Dict[int, Dict[str, int]] = {}
+    current_id, histogram = None, Counter()
+    for question_id, answer_text, count in answer_rows:
+        if question_id != current_id:
+            if current_id is not None:
+                top_answers[current_id] = dict(histogram.most_common(TOP_ANSWERS))
+            current_id, histogram = question_id, Counter()
+        histogram[normalise_answer(answer_text)] += count
+    if current_id is not None:
+        top_answers[current_id] = dict(histogram.most_common(TOP_ANSWERS))
+
+    written = 0
+    for question_id in session.exec(live_ids.order_by(Question.id)).all():
+        attempts, correct = totals.get(question_id, (0, 0))
+        stats = QuestionStats(
+            question_id=question_id,
+            attempts=attempts,
+            correct_count=correct,
+            top_answers=top_answers.get(question_id, {}),
+        )
+        stats.correct_rate = _correct_rate(stats)
+        session.add(stats)
+        written += 1
+        if written % BACKFILL_BATCH_SIZE == 0:
+            session.flush()
+    session.commit()
+    return written
+
+
+def main() -> None:
+    init_db()
+    with get_session() as session:
+        written = backfill(session)
+    print(f"Rebuilt statistics for {written} question(s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,17 @@
 from datetime import datetime
 from enum import Enum
-from typing import List, Optional
+from typing import Dict, List, Optional
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 
 from backend.models import GamePhase, UserRole
 
 
+class ProfileMode(str, Enum):
+    CPROFILE = "cprofile"
+    SAMPLE = "sample"
+
+
 class TeamCreate(BaseModel):
     name: str
 
@@ -66,6 +71,25 @@ class QuestionRead(BaseModel):
         orm_mode = True
 
 
+class QuestionWithStats(QuestionRead):
+    attempts: Optional[int]
+    correct_count: Optional[int]
+    correct_rate: Optional[float]
+    last_used: Optional[datetime]
+
+
+class QuestionStatsRead(BaseModel):
+    question_id: int
+    attempts: int
+    correct_count: int
+    correct_rate: Optional[float]
+    top_answers: Dict[str, int]
+    last_used: Optional[datetime]
+
+    class Config:
+        orm_mode = True
+
+
 class AnswerSubmit(BaseModel):
     question_id: int
     team_id: int
@@ -83,6 +107,10 @@ class AnswerRead(BaseModel):
         orm_mode = True
 
 
+class AnswerGrade(BaseModel):
+    is_correct: bool
+
+
 class LeaderboardEntry(BaseModel):
     team_id: int
     team_name: str
@@ -100,4 +128,26 @@ class PhaseUpdate(BaseModel):
 
 
 class CurrentQuestionResponse(BaseModel):
-    question: Optional[QuestionRead] 
\ No newline at end of file
+    question: Optional[QuestionRead] 
+
+
+class ArchiveRequest(BaseModel):
+    season: str
+
+
+class ArchiveResult(BaseModel):
+    season: str
+    archived_game_ids: List[int]
+    # False when VACUUM was skipped because the database was busy; the games are archived either way
+    vacuumed: bool
+
+
+class ProfileArm(BaseModel):
+    route: str
+    count: int = Field(1, ge=1)
+    mode: ProfileMode = ProfileMode.CPROFILE
+
+
+class LoopProfileArm(BaseModel):
+    seconds: float = Field(..., gt=0, le=300)
+    mode: ProfileMode = ProfileMode.SAMPLE
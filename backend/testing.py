@@ -0,0 +1,47 @@
+"""Helpers for asserting on database access in tests."""
+
+from contextlib import contextmanager
+from typing import Generator, List
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.database import engine as default_engine
+
+
+class QueryCounter:
+    """Record every SQL statement executed on an engine while active."""
+
+    def __init__(self, engine: Engine = default_engine):
+        self.engine = engine
+        self.statements: List[str] = []
+
+    @property
+    def count(self) -> int:
+        return len(self.statements)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.engine, "before_cursor_execute", self._before_cursor_execute)
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        event.remove(self.engine, "before_cursor_execute", self._before_cursor_execute)
+
+
+@contextmanager
+def assert_max_queries(limit: int, engine: Engine = default_engine) -> Generator[QueryCounter, None, None]:
+    """Fail if the wrapped block (typically one test-client request) runs more than ``limit`` queries.
+
+    Example::
+
+        with assert_max_queries(3):
+            client.get("/games/1/questions")
+    """
+    with QueryCounter(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = "\n".join(f"  {idx}. {sql}" for idx, sql in enumerate(counter.statements, start=1))
+        raise AssertionError(f"Expected at most {limit} queries, got {counter.count}:\n{listing}")
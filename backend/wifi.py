@@ -1,34 +1,162 @@
-import subprocess
-from typing import List
+import asyncio
+import logging
+import os
+import re
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
 
 SSID = "QuizFix"
 AP_SERVICE = "quizwifi"
+INTERFACE = "wlan0"
 
+# Seconds between background status polls; 0 disables the poller
+POLL_INTERVAL = float(os.environ.get("WIFI_POLL_INTERVAL", "5"))
+# A hung command (e.g. sudo waiting for a password) is killed after this many seconds
+COMMAND_TIMEOUT = 5.0
 
-def _run(cmd: List[str]) -> subprocess.CompletedProcess:
-    return subprocess.run(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=False)
+logger = logging.getLogger(__name__)
 
+# An async command runner returns (returncode, stdout); swap it out to feed fake output
+CommandResult = Tuple[int, str]
+AsyncRunner = Callable[[List[str]], Awaitable[CommandResult]]
 
-def start_ap() -> bool:
-    result = _run(["sudo", "systemctl", "start", f"{AP_SERVICE}.service"])
-    return result.returncode == 0
+STATUS_CMD = ["systemctl", "is-active", f"{AP_SERVICE}.service"]
+START_CMD = ["sudo", "systemctl", "start", f"{AP_SERVICE}.service"]
+STOP_CMD = ["sudo", "systemctl", "stop", f"{AP_SERVICE}.service"]
+STATION_DUMP_CMD = ["sudo", "iw", "dev", INTERFACE, "station", "dump"]
 
 
-def stop_ap() -> bool:
-    result = _run(["sudo", "systemctl", "stop", f"{AP_SERVICE}.service"])
-    return result.returncode == 0
+async def run_command(cmd: List[str]) -> CommandResult:
+    """Run ``cmd`` without blocking the event loop."""
+    try:
+        proc = await asyncio.create_subprocess_exec(
+            *cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+        )
+    except OSError:
+        return 127, ""
+    try:
+        stdout, _ = await asyncio.wait_for(proc.communicate(), timeout=COMMAND_TIMEOUT)
+    except asyncio.TimeoutError:
+        proc.kill()
+        await proc.wait()
+        logger.warning("Command timed out after %ss: %s", COMMAND_TIMEOUT, " ".join(cmd))
+        return -1, ""
+    return proc.returncode, stdout.decode(errors="replace")
 
 
-def status_ap() -> dict:
-    status_cp = _run(["systemctl", "is-active", f"{AP_SERVICE}.service"])
-    is_active = status_cp.stdout.strip() == "active"
+async def start_ap(runner: AsyncRunner = run_command) -> bool:
+    returncode, _ = await runner(START_CMD)
+    return returncode == 0
 
-    clients: List[str] = []
-    if is_active:
-        iw = _run(["sudo", "iw", "dev", "wlan0", "station", "dump"])
-        for line in iw.stdout.splitlines():
-            if line.startswith("Station "):
-                mac = line.split()[1]
-                clients.append(mac)
 
-    return {"active": is_active, "clients": clients, "ssid": SSID} 
\ No newline at end of file
+async def stop_ap(runner: AsyncRunner = run_command) -> bool:
+    returncode, _ = await runner(STOP_CMD)
+    return returncode == 0
+
+
+_NUMBER_RE = re.compile(r"-?\d+(?:\.\d+)?")
+
+# iw field name -> (status key, type)
+_STATION_FIELDS = {
+    "inactive time": ("inactive_ms", int),
+    "rx bytes": ("rx_bytes", int),
+    "rx packets": ("rx_packets", int),
+    "tx bytes": ("tx_bytes", int),
+    "tx packets": ("tx_packets", int),
+    "tx retries": ("tx_retries", int),
+    "tx failed": ("tx_failed", int),
+    "signal": ("signal_dbm", int),
+    "signal avg": ("signal_avg_dbm", int),
+    "tx bitrate": ("tx_bitrate_mbps", float),
+    "rx bitrate": ("rx_bitrate_mbps", float),
+    "connected time": ("connected_seconds", int),
+}
+
+
+def parse_station_dump(output: str) -> List[Dict]:
+    """Parse ``iw dev <if> station dump`` into one dict per connected station."""
+    stations: List[Dict] = []
+    for line in output.splitlines():
+        if line.startswith("Station "):
+            stations.append({"mac": line.split()[1]})
+            continue
+        if not stations or ":" not in line:
+            continue
+        name, _, value = line.strip().partition(":")
+        field = _STATION_FIELDS.get(name.strip())
+        match = _NUMBER_RE.search(value)
+        if field and match:
+            key, cast = field
+            stations[-1][key] = cast(float(match.group()))
+    return stations
+
+
+def _build_status(is_active: bool, station_dump: str) -> dict:
+    stations = parse_station_dump(station_dump) if is_active else []
+    return {
+        "active": is_active,
+        "clients": [station["mac"] for station in stations],
+        "ssid": SSID,
+        "stations": stations,
+        "updated_at": datetime.utcnow().isoformat(),
+    }
+
+
+async def fetch_status(runner: AsyncRunner = run_command) -> dict:
+    _, status_out = await runner(STATUS_CMD)
+    is_active = status_out.strip() == "active"
+    station_dump = (await runner(STATION_DUMP_CMD))[1] if is_active else ""
+    return _build_status(is_active, station_dump)
+
+
+class WifiStatusPoller:
+    """Keep a cached AP status snapshot fresh from a background task.
+
+    ``on_change`` is awaited with the new snapshot whenever the number of
+    connected clients changes.
+    """
+
+    def __init__(
+        self,
+        interval: float = POLL_INTERVAL,
+        runner: AsyncRunner = run_command,
+        on_change: Optional[Callable[[dict], Awaitable[None]]] = None,
+    ):
+        self.interval = interval
+        self.runner = runner
+        self.on_change = on_change
+        self.snapshot: dict = {"active": False, "clients": [], "ssid": SSID, "stations": [], "updated_at": None}
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def refresh(self) -> dict:
+        previous_count = len(self.snapshot["clients"])
+        self.snapshot = await fetch_status(self.runner)
+        if len(self.snapshot["clients"]) != previous_count and self.on_change is not None:
+            await self.on_change(self.snapshot)
+        return self.snapshot
+
+    async def _poll(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception:
+                logger.exception("WiFi status poll failed")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.interval > 0 and not self.running:
+            self._task = asyncio.create_task(self._poll())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
@@ -0,0 +1,94 @@
+"""Compare the pydantic orm_mode response path with the lean row serializer.
+
+Usage (from the repo root):
+
+    python scripts/bench_serialization.py --rows 5000 --repeat 20
+
+Both paths read the same questions from a throwaway in-memory database and
+produce the same JSON document; only the time to fetch and encode differs.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from typing import List
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from backend import crud, models, schemas  # noqa: E402
+from backend.serialization import FastJSONResponse, columns_for, rows_to_dicts  # noqa: E402
+
+
+def populate(session: Session, rows: int) -> int:
+    game = crud.create_game(session, title="Benchmark")
+    round_ids = session.exec(select(models.Round.id).where(models.Round.game_id == game.id)).all()
+    for idx in range(rows):
+        session.add(
+            models.Question(
+                round_id=round_ids[idx % len(round_ids)],
+                order=idx,
+                text=f"Question number {idx} about something moderately long?",
+                answer=f"Answer {idx}",
+                media_url=f"/media/{idx}.png" if idx % 3 == 0 else None,
+            )
+        )
+    session.commit()
+    return game.id
+
+
+def orm_path(session: Session, game_id: int, limit: int) -> bytes:
+    questions = crud.list_questions_for_game(session, game_id, limit=limit)
+    validated = [schemas.QuestionRead.from_orm(question) for question in questions]
+    return JSONResponse(jsonable_encoder(validated)).body
+
+
+def lean_path(session: Session, game_id: int, limit: int) -> bytes:
+    columns = columns_for(schemas.QuestionRead, models.Question)
+    rows = crud.list_questions_for_game(session, game_id, limit=limit, columns=columns)
+    return FastJSONResponse(rows_to_dicts(rows, len(columns))).body
+
+
+def bench(fn, engine, game_id: int, limit: int, repeat: int) -> List[float]:
+    timings = []
+    for _ in range(repeat):
+        with Session(engine) as session:
+            start = time.perf_counter()
+            fn(session, game_id, limit)
+            timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        game_id = populate(session, args.rows)
+
+    with Session(engine) as session:
+        expected = json.loads(orm_path(session, game_id, args.rows))
+        actual = json.loads(lean_path(session, game_id, args.rows))
+    assert expected == actual, "lean path output differs from the orm_mode path"
+
+    print(f"{args.rows} questions, best of {args.repeat}:")
+    results = {}
+    for name, fn in (("orm_mode + jsonable_encoder", orm_path), ("rows + FastJSONResponse", lean_path)):
+        results[name] = min(bench(fn, engine, game_id, args.rows, args.repeat))
+        print(f"  {name:<28} {results[name] * 1000:8.2f} ms")
+    orm, lean = results.values()
+    print(f"  speed-up: {orm / lean:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
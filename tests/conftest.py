@@ -0,0 +1,48 @@
+import os
+import tempfile
+
+# Point the app at throwaway paths before anything imports backend.database or backend.main
+_tmp_dir = tempfile.mkdtemp(prefix="trivia-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp_dir, 'trivia.db')}"
+os.environ["MEDIA_DIR"] = os.path.join(_tmp_dir, "media")
+os.environ["ARCHIVE_DIR"] = os.path.join(_tmp_dir, "archive")
+os.environ["HOST_TOKEN"] = "test-token"
+os.environ["WIFI_POLL_INTERVAL"] = "0"
+os.environ["SLOW_REQUEST_MS"] = "0"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlmodel import select  # noqa: E402
+
+from backend.database import get_session  # noqa: E402
+from backend.main import app  # noqa: E402
+from backend.models import Round  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def host_headers():
+    return {"X-Host-Token": os.environ["HOST_TOKEN"]}
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as client:
+        yield client
+
+
+@pytest.fixture
+def game(client):
+    """A fresh game with two questions in each of its first two rounds."""
+    game_id = client.post("/games", json={"title": "Test night"}).json()["id"]
+    with get_session() as session:
+        round_ids = session.exec(select(Round.id).where(Round.game_id == game_id).order_by(Round.number)).all()
+    questions = [
+        client.post(
+            "/questions",
+            json={"round_id": round_id, "order": order, "text": f"Q{number}.{order}", "answer": "paris"},
+        ).json()["id"]
+        # Created out of order so the (round, order, id) sort differs from id order
+        for number, round_id in reversed(list(enumerate(round_ids[:2], start=1)))
+        for order in (2, 1)
+    ]
+    return {"id": game_id, "round_ids": round_ids, "question_ids": questions}
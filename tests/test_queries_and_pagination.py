@@ -0,0 +1,83 @@
+from backend.database import get_session
+from backend.models import Question
+from backend.testing import assert_max_queries
+
+
+def _walk(client, url, limit=2):
+    """Follow X-Next-Cursor from the first page to the last; return every row seen."""
+    rows, after = [], None
+    while True:
+        params = {"limit": limit} if after is None else {"limit": limit, "after": after}
+        response = client.get(url, params=params)
+        assert response.status_code == 200, response.text
+        page = response.json()
+        assert len(page) <= limit
+        rows.extend(page)
+        after = response.headers.get("X-Next-Cursor")
+        if after is None:
+            return rows
+
+
+def test_submit_answer_loads_round_and_game_eagerly(client, game):
+    team_id = client.post("/teams", json={"name": "Eager"}).json()["id"]
+    question_id = game["question_ids"][0]
+
+    # question+round+game, insert, stats read, stats update, refresh, leaderboard
+    with assert_max_queries(6):
+        response = client.post("/answers", json={"question_id": question_id, "team_id": team_id, "answer_text": "Paris"})
+    assert response.status_code == 200
+    assert response.json()["is_correct"] is True
+
+
+def test_broadcast_question_loads_round_and_game_eagerly(client, game, host_headers):
+    question_id = game["question_ids"][0]
+
+    # question+round+game, current question update, refresh
+    with assert_max_queries(3):
+        response = client.post(f"/questions/{question_id}/broadcast", headers=host_headers)
+    assert response.status_code == 200
+
+
+def test_list_page_is_a_single_query(client, game):
+    with assert_max_queries(1):
+        client.get("/teams", params={"limit": 2})
+
+
+def test_id_cursor_walks_every_row_once(client):
+    for idx in range(5):
+        client.post("/teams", json={"name": f"Walker {idx}"})
+
+    walked = [team["id"] for team in _walk(client, "/teams")]
+    everything = [team["id"] for team in client.get("/teams", params={"limit": 500}).json()]
+    assert walked == everything == sorted(everything)
+
+
+def test_composite_cursor_follows_round_order_id(client, game):
+    walked = _walk(client, f"/games/{game['id']}/questions")
+
+    with get_session() as session:
+        questions = [session.get(Question, question_id) for question_id in game["question_ids"]]
+        expected = [question.id for question in sorted(questions, key=lambda q: (q.round_id, q.order, q.id))]
+    assert [question["id"] for question in walked] == expected
+    assert set(walked[0]) == {"id", "text", "media_url", "order"}
+
+
+def test_cursor_survives_its_row_being_archived(client, host_headers):
+    game_ids = [client.post("/games", json={"title": f"Archive me {idx}"}).json()["id"] for idx in range(4)]
+
+    first = client.get("/games", params={"limit": 2})
+    assert [game["id"] for game in first.json()] == game_ids[:1:-1]
+    cursor_game = game_ids[2]
+    client.post(f"/games/{cursor_game}/phase", json={"phase": "finished"})
+    archived = client.post("/archive", json={"season": "test"}, headers=host_headers).json()
+    assert cursor_game in archived["archived_game_ids"]
+
+    second = client.get("/games", params={"limit": 2, "after": first.headers["X-Next-Cursor"]})
+    assert second.status_code == 200
+    assert [game["id"] for game in second.json()] == game_ids[1::-1]
+
+
+def test_malformed_cursor_is_rejected(client):
+    assert client.get("/games", params={"after": "not-a-cursor"}).status_code == 400
+    # A well-formed key of the wrong length for this sort
+    assert client.get("/games", params={"after": "WzEsMl0="}).status_code == 400
@@ -0,0 +1,105 @@
+import asyncio
+
+from backend import wifi
+
+STATION_DUMP = """\
+Station aa:bb:cc:dd:ee:01 (on wlan0)
+\tinactive time:\t120 ms
+\trx bytes:\t48213
+\trx packets:\t310
+\ttx bytes:\t90211
+\ttx packets:\t295
+\ttx retries:\t4
+\ttx failed:\t0
+\tsignal:  \t-52 [-54, -55] dBm
+\tsignal avg:\t-53 dBm
+\ttx bitrate:\t72.2 MBit/s MCS 7 short GI
+\trx bitrate:\t65.0 MBit/s MCS 6
+\tauthorized:\tyes
+\tconnected time:\t341 seconds
+Station aa:bb:cc:dd:ee:02 (on wlan0)
+\tinactive time:\t4000 ms
+\tsignal:  \t-71 dBm
+"""
+
+
+class FakeRunner:
+    """Answer ``systemctl is-active`` and ``iw station dump`` from canned output."""
+
+    def __init__(self, station_dump: str = "", active: bool = True):
+        self.station_dump = station_dump
+        self.active = active
+        self.calls = []
+
+    async def __call__(self, cmd):
+        self.calls.append(cmd)
+        if cmd == wifi.STATUS_CMD:
+            return 0, "active\n" if self.active else "inactive\n"
+        if cmd == wifi.STATION_DUMP_CMD:
+            return 0, self.station_dump
+        return 0, ""
+
+
+def test_parse_station_dump():
+    stations = wifi.parse_station_dump(STATION_DUMP)
+
+    assert [station["mac"] for station in stations] == ["aa:bb:cc:dd:ee:01", "aa:bb:cc:dd:ee:02"]
+    assert stations[0] == {
+        "mac": "aa:bb:cc:dd:ee:01",
+        "inactive_ms": 120,
+        "rx_bytes": 48213,
+        "rx_packets": 310,
+        "tx_bytes": 90211,
+        "tx_packets": 295,
+        "tx_retries": 4,
+        "tx_failed": 0,
+        "signal_dbm": -52,
+        "signal_avg_dbm": -53,
+        "tx_bitrate_mbps": 72.2,
+        "rx_bitrate_mbps": 65.0,
+        "connected_seconds": 341,
+    }
+    assert stations[1] == {"mac": "aa:bb:cc:dd:ee:02", "inactive_ms": 4000, "signal_dbm": -71}
+
+
+def test_parse_station_dump_without_stations():
+    assert wifi.parse_station_dump("") == []
+
+
+def test_poller_calls_on_change_only_when_client_count_changes():
+    runner = FakeRunner()
+    changes = []
+
+    async def on_change(snapshot):
+        changes.append(len(snapshot["clients"]))
+
+    poller = wifi.WifiStatusPoller(interval=0, runner=runner, on_change=on_change)
+
+    async def scenario():
+        await poller.refresh()  # no clients, as before
+        runner.station_dump = STATION_DUMP
+        await poller.refresh()  # 0 -> 2
+        await poller.refresh()  # still 2
+        runner.active = False
+        await poller.refresh()  # AP down: 2 -> 0, station dump not run
+        await poller.refresh()  # still 0
+
+    asyncio.run(scenario())
+
+    assert changes == [2, 0]
+    assert poller.snapshot["active"] is False
+    assert runner.calls.count(wifi.STATION_DUMP_CMD) == 3
+
+
+def test_start_and_stop_use_the_runner():
+    runner = FakeRunner()
+
+    assert asyncio.run(wifi.start_ap(runner)) is True
+    assert asyncio.run(wifi.stop_ap(runner)) is True
+    assert runner.calls == [wifi.START_CMD, wifi.STOP_CMD]
+
+
+def test_run_command_kills_hung_commands(monkeypatch):
+    monkeypatch.setattr(wifi, "COMMAND_TIMEOUT", 0.1)
+
+    assert asyncio.run(wifi.run_command(["sleep", "5"])) == (-1, "")